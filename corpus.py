@@ -0,0 +1,454 @@
+"""
+Corpus de reviews en disco para análisis de texto con memoria acotada
+Formato (una carpeta por corpus):
+
+    text.bin            Texto original en UTF-8, reviews concatenadas
+    text_offsets.npy    Offsets en bytes (N + 1) de cada review en text.bin
+    tokens.bin          Tokens normalizados (ver texto.py), una review por línea
+    tokens_offsets.npy  Offsets en bytes (N + 1) de cada review en tokens.bin
+    place.npy           Índice del negocio de cada review en places.json
+    rating.npy          Rating de la review (0 si no tiene)
+    language.npy        Idioma de la review
+    time.npy            Fecha de la review (epoch en segundos, 0 si no tiene)
+    key.npy             Hash de (place_id, fecha, texto) de cada review, ordenados,
+                        para no repetir reviews
+    places.json         Lista de place_id de Google Places
+
+Los .bin se abren con mmap y los .npy con mmap_mode='r', así que abrir un
+corpus no lee el texto; cada consulta recorre sólo los bytes que necesita.
+"""
+
+import hashlib
+import io
+import json
+import mmap
+import os
+import re
+from array import array
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from numpy.lib import format as npy_format
+
+from texto import (
+    MIN_WORD_LENGTH, NORMALIZED_STOPWORDS, build_review_table, fold_text,
+    normalize_reviews, stem_word, word_frequencies,
+)
+
+
+LANGUAGE_DTYPE = 'S8'
+CHUNK_BYTES = 8 * 1024 * 1024
+
+COLUMNS = {
+    'place': 'i',
+    'rating': 'b',
+    'time': 'q',
+}
+
+# Filas que se copian a la vez al reordenar key.npy
+CHUNK_ROWS = 1 << 20
+
+
+def _path(directory, name):
+    return os.path.join(directory, name)
+
+
+def review_key(place_id, time, text):
+    """Hash de 64 bits que identifica una review (el mismo en cada corrida)"""
+    data = f"{place_id}\0{int(time)}\0{text}".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little', signed=True)
+
+
+def _append_npy(filename, values, dtype, rows=None):
+    """
+    Agrega valores al final de un .npy de una dimensión sin leerlo completo
+
+    Sólo se reescribe el encabezado con la nueva longitud. Si se da rows, las
+    filas posteriores (de una escritura interrumpida) se descartan antes.
+    """
+    values = np.asarray(values, dtype=dtype)
+    if not os.path.exists(filename):
+        np.save(filename, values)
+        return
+
+    with open(filename, 'r+b') as f:
+        version = npy_format.read_magic(f)
+        if version == (1, 0):
+            read_header, write_header = npy_format.read_array_header_1_0, npy_format.write_array_header_1_0
+        else:
+            read_header, write_header = npy_format.read_array_header_2_0, npy_format.write_array_header_2_0
+        (stored,), _, stored_dtype = read_header(f)
+        data_start = f.tell()
+        stored = stored if rows is None else min(stored, rows)
+
+        header = io.BytesIO()
+        write_header(header, {
+            'descr': npy_format.dtype_to_descr(stored_dtype),
+            'fortran_order': False,
+            'shape': (stored + len(values),),
+        })
+        if header.tell() == data_start:
+            f.seek(data_start + stored * stored_dtype.itemsize)
+            f.truncate()
+            f.write(values.astype(stored_dtype).tobytes())
+            f.seek(0)
+            f.write(header.getvalue())
+            return
+
+    # Encabezado sin espacio para crecer (archivos de NumPy < 1.23)
+    data = np.array(np.load(filename, mmap_mode='r')[:stored])
+    np.save(filename, np.concatenate([data, values.astype(data.dtype)]))
+
+
+def _merge_sorted_npy(filename, values):
+    """Inserta valores en un .npy ordenado, copiando de a CHUNK_ROWS filas"""
+    values = np.sort(np.asarray(values, dtype=np.int64))
+    if not os.path.exists(filename):
+        np.save(filename, values)
+        return
+
+    existing = np.load(filename, mmap_mode='r')
+    positions = np.searchsorted(existing, values)
+    temp = f"{filename}.tmp"
+    merged = npy_format.open_memmap(temp, mode='w+', dtype=np.int64,
+                                    shape=(len(existing) + len(values),))
+    merged[positions + np.arange(len(values))] = values
+    # Cada valor existente se recorre tantas filas como valores nuevos le precedan
+    for start in range(0, len(existing), CHUNK_ROWS):
+        rows = np.arange(start, min(start + CHUNK_ROWS, len(existing)))
+        merged[rows + np.searchsorted(positions, rows, side='right')] = existing[start:rows[-1] + 1]
+    merged.flush()
+    del merged, existing
+    os.replace(temp, filename)
+
+
+def _runs(indices):
+    """Rangos [inicio, fin) de índices consecutivos"""
+    indices = np.unique(np.asarray(indices, dtype=np.int64))
+    if not len(indices):
+        return
+    # Cortes donde se rompe una racha de índices consecutivos
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    for run in np.split(indices, breaks):
+        yield int(run[0]), int(run[-1]) + 1
+
+
+class ReviewCorpusWriter:
+    """
+    Agrega reviews a un corpus en disco (crea la carpeta si no existe)
+
+    Sólo las reviews nuevas de la corrida se guardan en memoria; las columnas
+    existentes se abren con mmap y al cerrar se les agregan las filas nuevas.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        places_file = _path(directory, 'places.json')
+        if os.path.exists(places_file):
+            with open(places_file, encoding='utf-8') as f:
+                self.places = json.load(f)
+        else:
+            self.places = []
+        self.place_index = {place: i for i, place in enumerate(self.places)}
+
+        # text_offsets.npy se guarda al último, así que define cuántas
+        # reviews completas tiene el corpus
+        text_offsets = self._map_column('text_offsets')
+        self.stored = len(text_offsets) - 1 if text_offsets is not None else 0
+
+        self.offsets = {}
+        self.positions = {}
+        self.blobs = {}
+        for blob in ('text', 'tokens'):
+            offsets = self._map_column(f'{blob}_offsets')
+            if offsets is None:
+                self.offsets[blob] = array('q', [0])
+                self.positions[blob] = 0
+            else:
+                self.offsets[blob] = array('q')
+                self.positions[blob] = int(offsets[self.stored])
+            # Descarta bytes escritos después del último offset (escritura
+            # interrumpida) para que el archivo y el índice coincidan
+            handle = open(_path(directory, f'{blob}.bin'), 'ab')
+            handle.truncate(self.positions[blob])
+            self.blobs[blob] = handle
+
+        self.columns = {name: array(code) for name, code in COLUMNS.items()}
+        # Idiomas como bytes de ancho fijo, igual que en language.npy
+        self.languages = bytearray()
+
+        # key.npy tiene una llave por review, ordenadas para buscar con
+        # searchsorted; si no coincide con el corpus se recalcula
+        keys = self._map_column('key')
+        if keys is None or len(keys) != self.stored:
+            np.save(_path(directory, 'key.npy'), np.sort(np.fromiter(self._existing_keys(), np.int64)))
+            keys = self._map_column('key')
+        self.stored_keys = keys
+        self.new_keys = set()
+
+    def _map_column(self, name):
+        filename = _path(self.directory, f'{name}.npy')
+        return np.load(filename, mmap_mode='r') if os.path.exists(filename) else None
+
+    def _existing_keys(self):
+        if not self.stored:
+            return
+        offsets = self._map_column('text_offsets')
+        places = self._map_column('place')
+        times = self._map_column('time')
+        with open(_path(self.directory, 'text.bin'), 'rb') as f:
+            for i in range(self.stored):
+                text = f.read(int(offsets[i + 1] - offsets[i])).decode('utf-8')
+                yield review_key(self.places[places[i]], times[i], text)
+
+    def __len__(self):
+        return self.stored + len(self.columns['place'])
+
+    def _is_stored(self, keys):
+        """Indica qué llaves ya están en key.npy"""
+        keys = np.asarray(keys, dtype=np.int64)
+        if not len(self.stored_keys):
+            return np.zeros(len(keys), dtype=bool)
+        positions = np.searchsorted(self.stored_keys, keys)
+        return self.stored_keys[np.minimum(positions, len(self.stored_keys) - 1)] == keys
+
+    def add_businesses(self, businesses_df, batch_size=500):
+        """
+        Agrega las reviews de un DataFrame de negocios (con place_id y reviews)
+
+        Las reviews se normalizan por lotes, así que la memoria depende de
+        batch_size y no del total de negocios. Las reviews que ya están en el
+        corpus (mismo negocio, fecha y texto) se omiten, así que volver a
+        guardar la misma búsqueda no duplica los conteos.
+
+        Returns:
+            Número de reviews agregadas (sin contar las repetidas)
+        """
+        added = 0
+        for start in range(0, len(businesses_df), batch_size):
+            batch = businesses_df.iloc[start:start + batch_size]
+            table = normalize_reviews(build_review_table(batch))
+            if table.empty:
+                continue
+            # Sin place_id (ej: datos de un CSV anterior) se usa el nombre
+            keys = batch['place_id'] if 'place_id' in batch else batch['name']
+            place_ids = keys.reindex(table['business']).fillna('').tolist()
+
+            times = pd.to_numeric(table['time'], errors='coerce').fillna(0)
+            review_keys = [review_key(*review) for review in zip(place_ids, times, table['text'])]
+            new = []
+            for key, stored in zip(review_keys, self._is_stored(review_keys)):
+                new.append(not stored and key not in self.new_keys)
+                if new[-1]:
+                    self.new_keys.add(key)
+            if not any(new):
+                continue
+
+            table = table[new]
+            place_ids = [place for place, is_new in zip(place_ids, new) if is_new]
+            self._append(table, place_ids)
+            added += len(table)
+        return added
+
+    def _append(self, table, place_ids):
+        for place in place_ids:
+            if place not in self.place_index:
+                self.place_index[place] = len(self.places)
+                self.places.append(place)
+
+        encoded = {
+            'text': [text.encode('utf-8') for text in table['text']],
+            'tokens': [(' '.join(tokens) + '\n').encode('utf-8') for tokens in table['tokens']],
+        }
+        for blob, chunks in encoded.items():
+            offsets = self.offsets[blob]
+            position = self.positions[blob]
+            for chunk in chunks:
+                position += len(chunk)
+                offsets.append(position)
+            self.positions[blob] = position
+            self.blobs[blob].write(b''.join(chunks))
+
+        self.columns['place'].extend(self.place_index[p] for p in place_ids)
+        self.columns['rating'].extend(
+            pd.to_numeric(table['review_rating'], errors='coerce').fillna(0).astype(int).tolist()
+        )
+        self.columns['time'].extend(
+            pd.to_numeric(table['time'], errors='coerce').fillna(0).astype('int64').tolist()
+        )
+        width = np.dtype(LANGUAGE_DTYPE).itemsize
+        for language in table['language']:
+            code = language.encode('ascii', 'ignore') if isinstance(language, str) else b''
+            self.languages += code[:width].ljust(width, b'\0')
+
+    def close(self):
+        """
+        Cierra los archivos y agrega las filas nuevas al índice y los metadatos
+
+        text_offsets.npy se escribe después de las columnas y key.npy al
+        final, así una escritura interrumpida se descarta al volver a abrir.
+        """
+        for handle in self.blobs.values():
+            handle.close()
+        with open(_path(self.directory, 'places.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.places, f)
+        for name, code in COLUMNS.items():
+            _append_npy(_path(self.directory, f'{name}.npy'), self.columns[name],
+                        np.dtype(code), self.stored)
+        _append_npy(_path(self.directory, 'language.npy'),
+                    np.frombuffer(self.languages, dtype=LANGUAGE_DTYPE), LANGUAGE_DTYPE, self.stored)
+        for blob in ('tokens', 'text'):
+            _append_npy(_path(self.directory, f'{blob}_offsets.npy'), self.offsets[blob],
+                        np.int64, self.stored + 1)
+
+        self.stored_keys = None
+        _merge_sorted_npy(_path(self.directory, 'key.npy'), list(self.new_keys))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReviewCorpus:
+    """Corpus de reviews abierto con mmap (sólo lectura)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._files = []
+        self.text = self._map('text')
+        self.tokens = self._map('tokens')
+        self.text_offsets = np.load(_path(directory, 'text_offsets.npy'), mmap_mode='r')
+        self.tokens_offsets = np.load(_path(directory, 'tokens_offsets.npy'), mmap_mode='r')
+        self.place = np.load(_path(directory, 'place.npy'), mmap_mode='r')
+        self.rating = np.load(_path(directory, 'rating.npy'), mmap_mode='r')
+        self.time = np.load(_path(directory, 'time.npy'), mmap_mode='r')
+        self.language = np.load(_path(directory, 'language.npy'), mmap_mode='r')
+        with open(_path(directory, 'places.json'), encoding='utf-8') as f:
+            self.places = json.load(f)
+
+    def _map(self, blob):
+        handle = open(_path(self.directory, f'{blob}.bin'), 'rb')
+        self._files.append(handle)
+        if os.fstat(handle.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        for data in (self.text, self.tokens):
+            if isinstance(data, mmap.mmap):
+                data.close()
+        for handle in self._files:
+            handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.text_offsets) - 1
+
+    def review(self, i):
+        """Texto original de una review"""
+        start, end = self.text_offsets[i], self.text_offsets[i + 1]
+        return self.text[start:end].decode('utf-8')
+
+    def select_places(self, place_ids):
+        """Índices de las reviews de los negocios dados (ej: worst['place_id'])"""
+        lookup = {place: i for i, place in enumerate(self.places)}
+        codes = [lookup[p] for p in place_ids if p in lookup]
+        return np.flatnonzero(np.isin(self.place, codes))
+
+    def iter_reviews(self, indices=None):
+        """Recorre el texto original de todas las reviews o de un subconjunto"""
+        indices = range(len(self)) if indices is None else indices
+        for i in indices:
+            yield self.review(i)
+
+    def _token_chunks(self, indices=None, chunk_bytes=CHUNK_BYTES):
+        """
+        Bloques de líneas de tokens (una por review) de a lo más chunk_bytes.
+        Sin índices se leen rangos contiguos del archivo; con índices se
+        agrupan las reviews consecutivas para leer el menor número de rangos.
+
+        Cada bloque es un memoryview sobre el mmap (no copia bytes); hay que
+        liberarlo (``with chunk:``) antes de cerrar el corpus.
+        """
+        offsets = self.tokens_offsets
+        runs = [(0, len(self))] if indices is None else _runs(indices)
+        tokens = memoryview(self.tokens)
+        try:
+            for start, last in runs:
+                while start < last:
+                    end = int(np.searchsorted(offsets, offsets[start] + chunk_bytes, side='right')) - 1
+                    end = min(max(end, start + 1), last)
+                    yield tokens[offsets[start]:offsets[end]]
+                    start = end
+        finally:
+            tokens.release()
+
+    def word_counts(self, indices=None, n=1, chunk_bytes=CHUNK_BYTES):
+        """
+        Frecuencia de palabras o n-gramas sobre todo el corpus o un subconjunto
+
+        Se procesa por bloques de chunk_bytes: la memoria usada depende del
+        tamaño del bloque y del vocabulario, no del tamaño del corpus.
+        """
+        counts = Counter()
+        for chunk in self._token_chunks(indices, chunk_bytes):
+            # El texto decodificado es la única copia del bloque
+            with chunk:
+                text = str(chunk, 'utf-8')
+            if n == 1:
+                # Se cuenta todo y se filtra después, una vez por palabra distinta
+                counts.update(text.split())
+                continue
+            table = pd.DataFrame({'tokens': [line.split() for line in text.split('\n')[:-1]]})
+            counts.update(word_frequencies(table, n))
+
+        if n == 1:
+            for word in [w for w in counts if len(w) < MIN_WORD_LENGTH or w in NORMALIZED_STOPWORDS]:
+                del counts[word]
+        return counts
+
+    def search(self, keyword, indices=None):
+        """
+        Índices de las reviews que contienen una palabra o frase
+
+        La búsqueda se hace sobre los tokens normalizados, así que no
+        distingue mayúsculas, acentos ni singular/plural. Con indices sólo se
+        leen los bytes de esas reviews.
+        """
+        words = fold_text(pd.Series([keyword])).iloc[0].split()
+        if not words or not isinstance(self.tokens, mmap.mmap):
+            return np.array([], dtype=np.int64)
+
+        variants = {' '.join(stem_word(w, lang) for w in words) for lang in ('es', 'en')}
+        alternatives = b'|'.join(re.escape(v.encode('utf-8')) for v in sorted(variants))
+        pattern = re.compile(rb'(?<![a-z0-9])(?:' + alternatives + rb')(?![a-z0-9])')
+
+        # Con índices sólo se recorren los bytes de cada racha de reviews consecutivas
+        offsets = self.tokens_offsets
+        runs = [(0, len(self))] if indices is None else _runs(indices)
+        positions = np.fromiter(
+            (m.start() for start, last in runs
+             for m in pattern.finditer(self.tokens, int(offsets[start]), int(offsets[last]))),
+            dtype=np.int64,
+        )
+        return np.unique(np.searchsorted(offsets, positions, side='right') - 1)
+
+    def metadata(self, indices=None):
+        """Columnas de metadatos como DataFrame (sin el texto)"""
+        indices = slice(None) if indices is None else indices
+        return pd.DataFrame({
+            'place_id': np.array(self.places, dtype=object)[self.place[indices]],
+            'rating': self.rating[indices],
+            'language': np.char.decode(np.asarray(self.language[indices]), 'ascii'),
+            'time': self.time[indices],
+        })
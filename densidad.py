@@ -0,0 +1,244 @@
+"""
+Análisis de densidad competitiva sobre una rejilla métrica
+Los negocios se rasterizan en celdas de tamaño fijo alrededor del centro de
+búsqueda y las superficies (densidad, rating promedio, volumen de reviews)
+se suavizan con un kernel gaussiano usando convolución por FFT
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+
+EARTH_RADIUS_M = 6371000.0
+
+# Lado máximo de la rejilla; si el radio lo excede se agrandan las celdas
+MAX_GRID_SIZE = 2048
+
+# Al exportar celdas se omiten las de valor menor a esta fracción del máximo
+# de la superficie (la cola del kernel) y se conservan a lo más MAX_EXPORT_POINTS
+EXPORT_RELATIVE_MIN = 0.01
+MAX_EXPORT_POINTS = 20000
+
+# Fracción del pico del kernel (la densidad suavizada en la celda de un solo
+# negocio) a partir de la cual una celda tiene soporte suficiente
+MIN_SUPPORT_FRACTION = 0.25
+
+
+class MetricGrid:
+    """Rejilla cuadrada en metros centrada en un punto (lat, lng)"""
+
+    def __init__(self, center, radius, cell_size=100):
+        """
+        Args:
+            center: Tupla (lat, lng) del centro
+            radius: Medio lado de la rejilla en metros
+            cell_size: Lado de cada celda en metros
+        """
+        self.center = center
+        self.radius = radius
+        self.cell_size = max(cell_size, 2 * radius / MAX_GRID_SIZE)
+        self.size = int(math.ceil(2 * radius / self.cell_size))
+        self._cos_lat = math.cos(math.radians(center[0]))
+
+    def project(self, lats, lngs):
+        """Convierte lat/lng a metros (x al este, y al norte) desde la esquina"""
+        lat0, lng0 = self.center
+        x = np.radians(np.asarray(lngs, dtype=float) - lng0) * EARTH_RADIUS_M * self._cos_lat
+        y = np.radians(np.asarray(lats, dtype=float) - lat0) * EARTH_RADIUS_M
+        return x + self.radius, y + self.radius
+
+    def cell_centers(self):
+        """Latitudes y longitudes (2D) del centro de cada celda"""
+        lat0, lng0 = self.center
+        offsets = (np.arange(self.size) + 0.5) * self.cell_size - self.radius
+        lats = lat0 + np.degrees(offsets / EARTH_RADIUS_M)
+        lngs = lng0 + np.degrees(offsets / (EARTH_RADIUS_M * self._cos_lat))
+        return np.meshgrid(lats, lngs, indexing='ij')
+
+    def distance_mask(self):
+        """Celdas cuyo centro está dentro del radio de búsqueda"""
+        offsets = (np.arange(self.size) + 0.5) * self.cell_size - self.radius
+        return np.hypot(offsets[:, None], offsets[None, :]) <= self.radius
+
+    def rasterize(self, lats, lngs, weights=None):
+        """
+        Suma los pesos de los puntos en cada celda (las filas crecen al norte y las columnas al este)
+        Los puntos fuera de la rejilla se ignoran.
+        """
+        x, y = self.project(lats, lngs)
+        cols = np.floor(x / self.cell_size).astype(np.int64)
+        rows = np.floor(y / self.cell_size).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.size) & (cols >= 0) & (cols < self.size)
+
+        flat = rows[inside] * self.size + cols[inside]
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float)[inside]
+        counts = np.bincount(flat, weights=weights, minlength=self.size * self.size)
+        return counts.reshape(self.size, self.size).astype(float)
+
+
+def gaussian_kernel(sigma_cells, truncate=3.0):
+    """Kernel gaussiano 2D normalizado a suma 1"""
+    half = max(int(math.ceil(truncate * sigma_cells)), 1)
+    axis = np.arange(-half, half + 1)
+    kernel_1d = np.exp(-0.5 * (axis / max(sigma_cells, 1e-9)) ** 2)
+    kernel = np.outer(kernel_1d, kernel_1d)
+    return kernel / kernel.sum()
+
+
+def fft_convolve(grid, kernel):
+    """
+    Convolución 2D por FFT con relleno de ceros (sin efecto circular).
+    Regresa una matriz del mismo tamaño que la rejilla.
+    """
+    rows = grid.shape[0] + kernel.shape[0] - 1
+    cols = grid.shape[1] + kernel.shape[1] - 1
+    shape = (1 << (rows - 1).bit_length(), 1 << (cols - 1).bit_length())
+
+    result = np.fft.irfft2(np.fft.rfft2(grid, shape) * np.fft.rfft2(kernel, shape), shape)
+    top = kernel.shape[0] // 2
+    left = kernel.shape[1] // 2
+    result = result[top:top + grid.shape[0], left:left + grid.shape[1]]
+    # La FFT deja residuos numéricos negativos muy pequeños
+    return np.clip(result, 0, None)
+
+
+class DensitySurfaces:
+    """Superficies suavizadas y celdas marcadas de un análisis de densidad"""
+
+    SURFACES = ('density', 'review_volume', 'avg_rating', 'reviews_per_business')
+
+    def __init__(self, grid, density, review_volume, avg_rating, reviews_per_business,
+                 opportunity, undersupplied):
+        self.grid = grid
+        self.density = density
+        self.review_volume = review_volume
+        self.avg_rating = avg_rating
+        self.reviews_per_business = reviews_per_business
+        self.opportunity = opportunity
+        self.undersupplied = undersupplied
+
+    def to_dataframe(self, surface, mask=None, min_value=0.0,
+                     relative_min=EXPORT_RELATIVE_MIN, max_points=MAX_EXPORT_POINTS):
+        """
+        Celdas de una superficie como DataFrame (lat, lng, value)
+
+        Args:
+            surface: Nombre de la superficie (ver SURFACES)
+            mask: Matriz booleana opcional para filtrar celdas
+            min_value: Sólo celdas con valor mayor a este
+            relative_min: Sólo celdas con valor mayor a esta fracción del
+                máximo de la superficie
+            max_points: Máximo de celdas; si hay más se conservan las de
+                mayor valor (None = sin límite)
+        """
+        if surface not in self.SURFACES:
+            raise ValueError(f"Superficie inválida: {surface}")
+        values = getattr(self, surface)
+        filled = np.nan_to_num(values, nan=-np.inf)
+        keep = filled > min_value
+        if keep.any():
+            keep &= filled > relative_min * filled[keep].max()
+        if mask is not None:
+            keep &= mask
+        keep = _limit_cells(keep, filled, max_points)
+        lats, lngs = self.grid.cell_centers()
+        return pd.DataFrame({'lat': lats[keep], 'lng': lngs[keep], 'value': values[keep]})
+
+    def opportunity_cells(self, max_points=MAX_EXPORT_POINTS):
+        """Celdas con alta demanda y baja calidad (las de mayor demanda si son más de max_points)"""
+        lats, lngs = self.grid.cell_centers()
+        mask = _limit_cells(self.opportunity, self.review_volume, max_points)
+        return pd.DataFrame({
+            'lat': lats[mask], 'lng': lngs[mask],
+            'review_volume': self.review_volume[mask],
+            'avg_rating': self.avg_rating[mask],
+        })
+
+    def save(self, filename):
+        """Guarda las superficies y la rejilla en un archivo .npz comprimido"""
+        np.savez_compressed(
+            filename,
+            center=np.array(self.grid.center),
+            radius=self.grid.radius,
+            cell_size=self.grid.cell_size,
+            opportunity=self.opportunity,
+            undersupplied=self.undersupplied,
+            **{name: getattr(self, name) for name in self.SURFACES}
+        )
+
+
+def _limit_cells(keep, values, max_points):
+    """Reduce una máscara a sus max_points celdas de mayor valor"""
+    if max_points is None or keep.sum() <= max_points:
+        return keep
+    flat = np.flatnonzero(keep)
+    top = flat[np.argpartition(values.ravel()[flat], -max_points)[-max_points:]]
+    limited = np.zeros(keep.size, dtype=bool)
+    limited[top] = True
+    return limited.reshape(keep.shape)
+
+
+def analyze_density(businesses_df, center, radius, cell_size=100, bandwidth=300,
+                    demand_quantile=0.75, low_rating=3.5, min_support=None):
+    """
+    Calcula superficies de densidad competitiva alrededor de un centro
+
+    Args:
+        businesses_df: DataFrame con columnas lat, lng, rating, total_ratings
+        center: Tupla (lat, lng) del centro de búsqueda
+        radius: Radio de búsqueda en metros
+        cell_size: Lado de cada celda en metros
+        bandwidth: Desviación estándar del kernel gaussiano en metros
+        demand_quantile: Percentil de volumen de reviews considerado alto
+        low_rating: Rating promedio por debajo del cual la calidad es baja
+        min_support: Densidad mínima (negocios suavizados por celda) para
+            confiar en el rating promedio de la celda. Por defecto es
+            MIN_SUPPORT_FRACTION del pico del kernel, así que depende de
+            cell_size y bandwidth: una celda a ~1.7 desviaciones estándar de
+            un negocio aislado todavía tiene soporte
+
+    Returns:
+        DensitySurfaces con densidad (negocios/km²), volumen de reviews,
+        rating promedio, reviews por negocio y las celdas marcadas
+    """
+    grid = MetricGrid(center, radius, cell_size)
+    kernel = gaussian_kernel(bandwidth / grid.cell_size)
+    if min_support is None:
+        min_support = MIN_SUPPORT_FRACTION * kernel.max()
+
+    lats = businesses_df['lat'].to_numpy(dtype=float)
+    lngs = businesses_df['lng'].to_numpy(dtype=float)
+    ratings = businesses_df['rating'].to_numpy(dtype=float)
+    volume = businesses_df['total_ratings'].to_numpy(dtype=float)
+    rated = ratings > 0
+
+    counts = fft_convolve(grid.rasterize(lats, lngs), kernel)
+    review_volume = fft_convolve(grid.rasterize(lats, lngs, volume), kernel)
+    rated_counts = fft_convolve(grid.rasterize(lats[rated], lngs[rated]), kernel)
+    rating_sum = fft_convolve(grid.rasterize(lats[rated], lngs[rated], ratings[rated]), kernel)
+
+    cell_km2 = (grid.cell_size / 1000) ** 2
+    density = counts / cell_km2
+
+    supported = rated_counts >= min_support
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_rating = np.where(supported, rating_sum / rated_counts, np.nan)
+        reviews_per_business = np.where(counts >= min_support, review_volume / counts, np.nan)
+
+    inside = grid.distance_mask()
+    opportunity = np.zeros_like(inside)
+    undersupplied = np.zeros_like(inside)
+
+    active = inside & supported
+    if active.any():
+        high_demand = review_volume >= np.quantile(review_volume[active], demand_quantile)
+        opportunity = active & high_demand & (avg_rating < low_rating)
+
+        ratio = reviews_per_business[active]
+        undersupplied = active & (reviews_per_business >= np.quantile(ratio, demand_quantile))
+
+    return DensitySurfaces(grid, density, review_volume, avg_rating, reviews_per_business,
+                           opportunity, undersupplied)
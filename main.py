@@ -11,14 +11,48 @@ from collections import Counter
 import time
 import json
 
+from corpus import ReviewCorpusWriter
+from densidad import analyze_density
+from mapa_capas import LayeredMap, split_by_type
+from texto import (
+    STOPWORDS, build_review_table, normalize_reviews, surface_forms, with_surface_forms,
+    word_frequencies,
+)
+
 load_dotenv()
 
+# Columnas de self.df con su tipo; una búsqueda sin resultados también las tiene
+BUSINESS_COLUMNS = {
+    'place_id': object,
+    'name': object,
+    'rating': float,
+    'total_ratings': 'int64',
+    'address': object,
+    'lat': float,
+    'lng': float,
+    'types': object,
+    'reviews': object,
+}
+
 
 class GoogleMapsAnalyzer:
-    def __init__(self, api_key):
-        """Inicializa el analizador con la API key de Google Maps"""
-        self.gmaps = googlemaps.Client(key=api_key)
+    def __init__(self, api_key, base_url=None):
+        """
+        Inicializa el analizador con la API key de Google Maps
+        
+        Args:
+            api_key: API key de Google Maps
+            base_url: URL alternativa del backend de Places (ej: un servidor
+                falso local para pruebas). Por defecto usa la API de Google.
+        """
+        if base_url:
+            self.gmaps = googlemaps.Client(key=api_key, base_url=base_url)
+        else:
+            self.gmaps = googlemaps.Client(key=api_key)
         self.businesses = []
+        self.reviews_df = None
+        self.surface_forms = None
+        self.detail_errors = 0
         
     def search_places(self, query, location, radius=5000, max_results=60):
         """
@@ -61,12 +95,14 @@ class GoogleMapsAnalyzer:
             return place_details.get('result', {})
         except Exception as e:
             print(f"Error obteniendo detalles: {e}")
+            self.detail_errors += 1
             return {}
     
     def collect_detailed_data(self):
         """Recopila datos detallados de todos los negocios"""
         print("\n📊 Recopilando datos detallados...")
         detailed_businesses = []
+        self.detail_errors = 0
         
         for i, business in enumerate(self.businesses, 1):
             print(f"  Procesando {i}/{len(self.businesses)}: {business.get('name', 'Sin nombre')}", end='\r')
@@ -75,6 +111,7 @@ class GoogleMapsAnalyzer:
             details = self.get_place_details(place_id)
             
             business_data = {
+                'place_id': place_id,
                 'name': business.get('name', 'Sin nombre'),
                 'rating': business.get('rating', 0),
                 'total_ratings': business.get('user_ratings_total', 0),
@@ -89,16 +126,32 @@ class GoogleMapsAnalyzer:
             time.sleep(0.1)  # Pequeña pausa para no exceder rate limits
         
         print("\n✅ Datos detallados recopilados")
-        self.df = pd.DataFrame(detailed_businesses)
+        self.df = pd.DataFrame(detailed_businesses, columns=list(BUSINESS_COLUMNS)).astype(BUSINESS_COLUMNS)
+        self.reviews_df = None
+        self.surface_forms = None
         return self.df
     
-    def get_top_businesses(self, n=15):
-        """Obtiene las mejores N unidades económicas"""
+    def rank_top(self, n=15):
+        """Calcula las mejores N unidades económicas sin imprimir nada"""
         # Filtrar negocios con rating > 0
-        df_filtered = self.df[self.df['rating'] > 0].copy()
+        df_filtered = self.df[self.df['rating'] > 0]
         
         # Ordenar por rating (descendente) y total_ratings (descendente)
-        top = df_filtered.nlargest(n, ['rating', 'total_ratings'])
+        return df_filtered.nlargest(n, ['rating', 'total_ratings'])
+    
+    def rank_worst(self, n=15):
+        """Calcula las peores N unidades económicas sin imprimir nada"""
+        # Filtrar negocios con rating > 0
+        df_filtered = self.df[self.df['rating'] > 0]
+        
+        # Ordenar por rating (ascendente) pero con suficientes reviews
+        # Para evitar negocios con pocas reviews que sesgan el resultado
+        df_filtered = df_filtered[df_filtered['total_ratings'] >= 3]
+        return df_filtered.nsmallest(n, ['rating'])
+    
+    def get_top_businesses(self, n=15):
+        """Obtiene las mejores N unidades económicas"""
+        top = self.rank_top(n)
         
         print(f"\n⭐ Top {n} Mejores Negocios:")
         print("-" * 80)
@@ -109,13 +162,7 @@ class GoogleMapsAnalyzer:
     
     def get_worst_businesses(self, n=15):
         """Obtiene las peores N unidades económicas"""
-        # Filtrar negocios con rating > 0
-        df_filtered = self.df[self.df['rating'] > 0].copy()
-        
-        # Ordenar por rating (ascendente) pero con suficientes reviews
-        # Para evitar negocios con pocas reviews que sesgan el resultado
-        df_filtered = df_filtered[df_filtered['total_ratings'] >= 3]
-        worst = df_filtered.nsmallest(n, ['rating'])
+        worst = self.rank_worst(n)
         
         print(f"\n⚠️ Top {n} Peores Negocios:")
         print("-" * 80)
@@ -154,73 +201,135 @@ class GoogleMapsAnalyzer:
         m.save(filename)
         print(f"✅ Mapa guardado: {filename}")
     
-    def extract_review_text(self, businesses_df):
-        """Extrae todo el texto de las reviews"""
-        all_text = []
+    def analyze_density(self, location, radius, cell_size=100, bandwidth=300):
+        """
+        Calcula la densidad competitiva alrededor del centro de búsqueda
+        
+        Args:
+            location: Tupla (lat, lng) del centro de búsqueda
+            radius: Radio de búsqueda en metros
+            cell_size: Lado de cada celda de la rejilla en metros
+            bandwidth: Radio de suavizado (desviación del kernel) en metros
+        
+        Returns:
+            DensitySurfaces con las superficies y las celdas marcadas
+        """
+        print(f"\n🧮 Calculando densidad competitiva (celdas de {cell_size}m)...")
+        
+        surfaces = analyze_density(self.df, location, radius, cell_size, bandwidth)
+        
+        print(f"✅ Rejilla de {surfaces.grid.size}x{surfaces.grid.size} celdas")
+        print(f"   Zonas de oportunidad (alta demanda, baja calidad): {int(surfaces.opportunity.sum())} celdas")
+        print(f"   Zonas con pocos negocios para su demanda: {int(surfaces.undersupplied.sum())} celdas")
+        return surfaces
+    
+    def create_layered_map(self, top_businesses, worst_businesses,
+                           filename='mapa_negocios.html', title='Análisis de Negocios',
+                           max_types=10, density=None):
+        """
+        Crea un solo mapa con capas de mejores, peores, todos y por tipo
         
-        for reviews in businesses_df['reviews']:
-            if isinstance(reviews, list):
-                for review in reviews:
-                    if isinstance(review, dict):
-                        text = review.get('text', '')
-                        if text:
-                            all_text.append(text)
+        Los datos de cada capa se guardan en archivos aparte y el navegador
+        sólo los descarga al activar la capa. Si se pasa el resultado de
+        analyze_density, se agregan capas de densidad y oportunidades.
+        """
+        print(f"\n🗺️ Creando mapa por capas: {filename}")
+        
+        layered = LayeredMap(title)
+        layered.add_layer('Mejores negocios (calor)', top_businesses, show=True)
+        layered.add_layer('Mejores negocios', top_businesses, kind='markers', color='green')
+        layered.add_layer('Peores negocios (calor)', worst_businesses)
+        layered.add_layer('Peores negocios', worst_businesses, kind='markers', color='red')
+        layered.add_layer('Todos los negocios (calor)', self.df)
+        
+        for business_type, type_df in list(split_by_type(self.df).items())[:max_types]:
+            layered.add_layer(f"Tipo: {business_type}", type_df)
+        
+        if density is not None:
+            layered.add_layer('Densidad de negocios', density.to_dataframe('density'),
+                              weight='value')
+            layered.add_layer('Volumen de reviews (demanda)',
+                              density.to_dataframe('review_volume'), weight='value')
+            layered.add_layer('Zonas de oportunidad', density.opportunity_cells(),
+                              weight='review_volume')
+            layered.add_layer('Pocos negocios para su demanda',
+                              density.to_dataframe('reviews_per_business',
+                                                   mask=density.undersupplied),
+                              weight='value')
+        
+        layers_dir = layered.save(filename)
+        if layers_dir:
+            print(f"✅ Mapa guardado: {filename} (capas en {layers_dir}/)")
+    
+    def get_review_table(self):
+        """
+        Tabla con una fila por review, ya normalizada y tokenizada
         
-        return ' '.join(all_text)
+        Se calcula una sola vez por conjunto de datos y la reutilizan las
+        word clouds, los conteos de palabras y cualquier otro análisis.
+        """
+        if self.reviews_df is None:
+            self.reviews_df = normalize_reviews(build_review_table(self.df))
+        return self.reviews_df
+    
+    def get_reviews(self, businesses_df):
+        """Filas de la tabla de reviews que pertenecen a los negocios dados"""
+        reviews = self.get_review_table()
+        return reviews[reviews['business'].isin(businesses_df.index)]
+    
+    def get_word_frequencies(self, businesses_df, n=1):
+        """Frecuencia de palabras (o n-gramas) en las reviews de los negocios"""
+        return word_frequencies(self.get_reviews(businesses_df), n)
+    
+    def get_display_frequencies(self, businesses_df, n=1):
+        """
+        Igual que get_word_frequencies, pero con cada token mostrado en su
+        forma original más frecuente ("atencion" → "atención")
+        """
+        if self.surface_forms is None:
+            self.surface_forms = surface_forms(self.get_review_table())
+        return with_surface_forms(self.get_word_frequencies(businesses_df, n), self.surface_forms)
+    
+    def extract_review_text(self, businesses_df):
+        """Extrae todo el texto de las reviews"""
+        return ' '.join(self.get_reviews(businesses_df)['text'])
     
     def create_wordcloud(self, text, filename, title):
-        """Crea una nube de palabras"""
+        """
+        Crea una nube de palabras
+        
+        Args:
+            text: Texto de las reviews o diccionario {palabra: frecuencia}
+                (ej: el resultado de get_display_frequencies)
+            filename: Archivo PNG de salida
+            title: Título de la imagen
+        """
         print(f"\n☁️ Creando word cloud: {filename}")
         
-        if not text or len(text.strip()) == 0:
+        if isinstance(text, dict):
+            has_content = len(text) > 0
+        else:
+            has_content = bool(text and text.strip())
+        
+        if not has_content:
             print("⚠️ No hay texto suficiente para crear word cloud")
             return
         
-        # Palabras comunes a excluir (stopwords en español)
-        stopwords = set([
-            # Spanish
-            'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'ser', 'se', 'no',
-            'haber', 'por', 'con', 'su', 'para', 'como', 'estar', 'tener',
-            'le', 'lo', 'todo', 'pero', 'más', 'hacer', 'o', 'poder', 'decir',
-            'este', 'ir', 'otro', 'ese', 'si', 'me', 'ya', 'ver', 'porque',
-            'dar', 'cuando', 'él', 'muy', 'sin', 'vez', 'mucho', 'saber',
-            'qué', 'sobre', 'mi', 'alguno', 'mismo', 'yo', 'también', 'hasta',
-            'año', 'dos', 'querer', 'entre', 'así', 'primero', 'desde', 'grande',
-            'eso', 'ni', 'nos', 'llegar', 'pasar', 'tiempo', 'ella', 'sí',
-            'día', 'uno', 'bien', 'poco', 'deber', 'entonces', 'poner', 'cosa',
-            'tanto', 'hombre', 'parecer', 'nuestro', 'tan', 'donde', 'ahora',
-            'parte', 'después', 'vida', 'quedar', 'siempre', 'creer', 'hablar',
-            'llevar', 'dejar', 'nada', 'cada', 'seguir', 'menos', 'nuevo', 'encontrar',
-            'algo', 'solo', 'fue',
-            
-            # English (existing + new)
-            'the', 'and', 'is', 'it', 'to', 'of', 'was', 'for', 'on', 'are', 'with',
-            'as', 'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves',
-            'you', 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself',
-            'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them', 'their',
-            'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this', 'that', 'these',
-            'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has',
-            'had', 'having', 'do', 'does', 'did', "didn't", "don't", 'doing', 'a', 'an', 'the', 'and', 
-            'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with',
-            'about', 'against', 'between', 'into', 'through', 'during', 'before', 'after',
-            'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over',
-            'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where',
-            'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other',
-            'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too',
-            'very', 's', 't', 'can', 'will', 'just', 'don', 'should', 'now'
-        ])
-        
         # Crear wordcloud
         wordcloud = WordCloud(
             width=1600,
             height=800,
             background_color='white',
-            stopwords=stopwords,
+            stopwords=STOPWORDS,
             max_words=100,
             colormap='viridis' if 'top' in filename.lower() else 'Reds',
             relative_scaling=0.5,
             min_font_size=10
-        ).generate(text)
+        )
+        if isinstance(text, dict):
+            wordcloud.generate_from_frequencies(text)
+        else:
+            wordcloud.generate(text)
         
         # Crear figura
         plt.figure(figsize=(20, 10))
@@ -282,6 +391,18 @@ class GoogleMapsAnalyzer:
         """Guarda los datos en un archivo CSV"""
         self.df.to_csv(filename, index=False, encoding='utf-8-sig')
         print(f"\n💾 Datos guardados: {filename}")
+    
+    def save_review_corpus(self, directory='corpus_reviews'):
+        """
+        Agrega las reviews al corpus en disco (se acumula entre corridas)
+        
+        El corpus se abre después con corpus.ReviewCorpus para contar
+        palabras o buscar sin cargar todo el texto en memoria.
+        """
+        with ReviewCorpusWriter(directory) as writer:
+            added = writer.add_businesses(self.df)
+            total = len(writer)
+        print(f"💾 {added} reviews agregadas al corpus: {directory}/ ({total} en total)")
 
 def main():
     # Cargar API key desde .env
@@ -381,13 +502,17 @@ def main():
     top_businesses = analyzer.get_top_businesses(15)
     worst_businesses = analyzer.get_worst_businesses(15)
     
-    # Crear mapas de calor
-    analyzer.create_heatmap(top_businesses, 'mapa_mejores_negocios.html', 'Mejores Negocios')
-    analyzer.create_heatmap(worst_businesses, 'mapa_peores_negocios.html', 'Peores Negocios')
+    # Densidad competitiva alrededor del centro de búsqueda
+    density = analyzer.analyze_density(LOCATION, RADIUS)
+    density.save('densidad_negocios.npz')
+    
+    # Crear mapa con capas (mejores, peores, todos, por tipo y densidad)
+    analyzer.create_layered_map(top_businesses, worst_businesses, 'mapa_negocios.html',
+                                f'Análisis de {QUERY}', density=density)
     
-    # Extraer texto de reviews
-    top_text = analyzer.extract_review_text(top_businesses)
-    worst_text = analyzer.extract_review_text(worst_businesses)
+    # Contar palabras de reviews (normalizadas una sola vez)
+    top_text = analyzer.get_display_frequencies(top_businesses)
+    worst_text = analyzer.get_display_frequencies(worst_businesses)
     
     # Crear word clouds
     analyzer.create_wordcloud(
@@ -406,18 +531,20 @@ def main():
     
     # Guardar datos
     analyzer.save_data()
+    analyzer.save_review_corpus()
     
     print("\n" + "=" * 80)
     print("✅ ANÁLISIS COMPLETADO")
     print("=" * 80)
     print("\n📁 Archivos generados:")
-    print("   - mapa_mejores_negocios.html")
-    print("   - mapa_peores_negocios.html")
+    print("   - mapa_negocios.html (+ carpeta mapa_negocios_capas/)")
     print("   - wordcloud_mejores.png")
     print("   - wordcloud_peores.png")
     print("   - analisis_estadistico.png")
+    print("   - densidad_negocios.npz")
     print("   - datos_negocios.csv")
-    print("\n🎉 ¡Listo! Abre los archivos HTML en tu navegador para ver los mapas.\n")
+    print("   - corpus_reviews/ (se acumula entre corridas)")
+    print("\n🎉 ¡Listo! Abre el archivo HTML en tu navegador para ver los mapas.\n")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,233 @@
+"""
+Exportación de mapas con varias capas en un solo archivo HTML
+Cada capa (mejores, peores, todos, por tipo, por corrida...) se guarda como
+un archivo lateral compacto que el navegador sólo carga al activar la capa
+"""
+
+import html
+import json
+import os
+import re
+
+import folium
+from branca.element import Template
+from folium.elements import JSCSSMixin
+from folium.plugins import HeatMap
+
+
+# Decimales de lat/lng en los archivos de capa (~0.1 m de precisión)
+COORD_DECIMALS = 6
+
+
+class LazyLayers(JSCSSMixin):
+    """Control de capas que carga los datos de cada capa al activarla"""
+
+    # Misma librería que usa HeatMap, referenciada una sola vez en el HTML
+    default_js = HeatMap.default_js
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var specs = {{ this.specs|tojson }};
+            var control = L.control.layers(null, null, {collapsed: false}).addTo(map);
+            var pending = {};
+
+            window.registerLazyLayer = function(id, data) {
+                var callback = pending[id];
+                delete pending[id];
+                if (callback) { callback(data); }
+            };
+
+            function buildLayer(spec, data) {
+                if (spec.kind === 'heat') {
+                    return L.heatLayer(data, {radius: 15, blur: 25, maxZoom: 13});
+                }
+                return L.geoJSON(data, {
+                    pointToLayer: function(feature, latlng) {
+                        return L.circleMarker(latlng, {
+                            radius: 6, color: spec.color, fillColor: spec.color,
+                            fillOpacity: 0.7, weight: 1
+                        });
+                    },
+                    onEachFeature: function(feature, layer) {
+                        var p = feature.properties;
+                        layer.bindPopup('<b>' + p.name + '</b><br>Rating: ' + p.rating
+                                        + '<br>Reviews: ' + p.total_ratings);
+                    }
+                });
+            }
+
+            specs.forEach(function(spec) {
+                var group = L.layerGroup();
+                group.once('add', function() {
+                    pending[spec.id] = function(data) {
+                        group.addLayer(buildLayer(spec, data));
+                    };
+                    var script = document.createElement('script');
+                    script.src = spec.src;
+                    document.head.appendChild(script);
+                });
+                control.addOverlay(group, spec.label + ' (' + spec.count + ')');
+                if (spec.show) { group.addTo(map); }
+            });
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, specs):
+        super().__init__()
+        self._name = 'LazyLayers'
+        self.specs = specs
+
+
+def slugify(text):
+    """Convierte un nombre de capa en un nombre de archivo seguro"""
+    slug = re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+    return slug or 'capa'
+
+
+def heat_payload(businesses_df, weight='total_ratings'):
+    """Puntos [lat, lng, peso] de una capa de calor"""
+    points = businesses_df[['lat', 'lng', weight]].astype(float)
+    points[['lat', 'lng']] = points[['lat', 'lng']].round(COORD_DECIMALS)
+    return points.values.tolist()
+
+
+def markers_payload(businesses_df):
+    """FeatureCollection GeoJSON con los datos mínimos para el popup"""
+    features = [
+        {
+            'type': 'Feature',
+            'geometry': {
+                'type': 'Point',
+                'coordinates': [round(lng, COORD_DECIMALS), round(lat, COORD_DECIMALS)]
+            },
+            'properties': {'name': html.escape(str(name)), 'rating': rating, 'total_ratings': total}
+        }
+        for name, rating, total, lat, lng in zip(
+            businesses_df['name'], businesses_df['rating'].astype(float),
+            businesses_df['total_ratings'].astype(int),
+            businesses_df['lat'].astype(float), businesses_df['lng'].astype(float)
+        )
+    ]
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def split_by_type(businesses_df, types=None):
+    """
+    Separa los negocios por tipo de Google Places
+
+    Args:
+        businesses_df: DataFrame con la columna 'types' (separada por comas)
+        types: Lista de tipos a incluir. Por defecto, todos los encontrados.
+
+    Returns:
+        Diccionario {tipo: DataFrame}
+    """
+    exploded = businesses_df.assign(
+        _type=businesses_df['types'].fillna('').str.split(', ')
+    ).explode('_type')
+    exploded = exploded[exploded['_type'] != '']
+
+    if types is None:
+        types = exploded['_type'].value_counts().index.tolist()
+
+    groups = {name: group.drop(columns='_type') for name, group in exploded.groupby('_type')}
+    return {t: groups[t] for t in types if t in groups}
+
+
+class LayeredMap:
+    """Mapa folium con varias capas cargadas bajo demanda"""
+
+    def __init__(self, title, zoom_start=13):
+        self.title = title
+        self.zoom_start = zoom_start
+        self.layers = []
+
+    def add_layer(self, label, businesses_df, kind='heat', color='#2c7bb6', show=False,
+                  weight='total_ratings'):
+        """
+        Agrega una capa al mapa
+
+        Args:
+            label: Nombre visible en el control de capas
+            businesses_df: DataFrame con columnas lat, lng, total_ratings (y
+                name, rating para marcadores)
+            kind: 'heat' para mapa de calor o 'markers' para puntos con popup
+            color: Color de los marcadores
+            show: Si la capa se muestra (y se carga) al abrir el mapa
+            weight: Columna usada como intensidad en capas de calor
+        """
+        if kind not in ('heat', 'markers'):
+            raise ValueError(f"Tipo de capa inválido: {kind}")
+        self.layers.append({
+            'label': label, 'df': businesses_df, 'kind': kind,
+            'color': color, 'show': show, 'weight': weight
+        })
+
+    def save(self, filename):
+        """
+        Guarda el HTML y una carpeta '<nombre>_capas' con un archivo por capa
+
+        Returns:
+            Ruta de la carpeta con los archivos de capa
+        """
+        layers = [layer for layer in self.layers if not layer['df'].empty]
+        if not layers:
+            print("⚠️ No hay datos para crear el mapa")
+            return None
+
+        stem = os.path.splitext(filename)[0]
+        layers_dir = f"{stem}_capas"
+        os.makedirs(layers_dir, exist_ok=True)
+        relative_dir = os.path.basename(layers_dir)
+
+        # Centro del mapa: promedio ponderado de todas las capas
+        total = sum(len(layer['df']) for layer in layers)
+        center_lat = sum(layer['df']['lat'].sum() for layer in layers) / total
+        center_lng = sum(layer['df']['lng'].sum() for layer in layers) / total
+
+        m = folium.Map(
+            location=[center_lat, center_lng],
+            zoom_start=self.zoom_start,
+            tiles='OpenStreetMap'
+        )
+
+        specs = []
+        used = set()
+        for layer in layers:
+            layer_id = slugify(f"{layer['label']}_{layer['kind']}")
+            while layer_id in used:
+                layer_id += '_'
+            used.add(layer_id)
+
+            if layer['kind'] == 'heat':
+                payload = heat_payload(layer['df'], layer['weight'])
+            else:
+                payload = markers_payload(layer['df'])
+
+            # Se envuelve en JS para poder cargarlo con <script> incluso
+            # abriendo el HTML directamente desde el disco (file://)
+            path = os.path.join(layers_dir, f"{layer_id}.js")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f"registerLazyLayer({json.dumps(layer_id)},")
+                json.dump(payload, f, separators=(',', ':'), ensure_ascii=False)
+                f.write(");\n")
+
+            specs.append({
+                'id': layer_id,
+                # El control de capas de Leaflet interpreta la etiqueta como HTML
+                'label': html.escape(layer['label']),
+                'kind': layer['kind'],
+                'color': layer['color'],
+                'show': layer['show'],
+                'count': len(layer['df']),
+                'src': f"{relative_dir}/{layer_id}.js",
+            })
+
+        title_html = f'<h3 style="text-align:center;margin:4px">{html.escape(self.title)}</h3>'
+        m.get_root().html.add_child(folium.Element(title_html))
+        LazyLayers(specs).add_to(m)
+        m.save(filename)
+        return layers_dir
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Servicio HTTP/JSON local sobre GoogleMapsAnalyzer
+Mantiene en memoria los datos recopilados, el índice espacial y las
+frecuencias de palabras de cada búsqueda para responder sin volver a
+consultar la API de Google Maps
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+import traceback
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+import googlemaps
+import numpy as np
+
+from main import GoogleMapsAnalyzer
+
+
+DEFAULT_QUERY = "restaurante"
+DEFAULT_LOCATION = (25.6866142, -100.3161126)  # Monterrey, México
+DEFAULT_RADIUS = 5000
+
+# Columnas que se devuelven en los rankings (sin el texto de las reviews)
+PUBLIC_COLUMNS = ['name', 'rating', 'total_ratings', 'address', 'lat', 'lng', 'types']
+
+SUBSETS = ('top', 'worst', 'all')
+
+# Entradas derivadas (rankings, áreas, palabras...) por dataset
+MAX_CACHE_ENTRIES = 256
+
+# Segundos que un dataset se sirve desde memoria antes de volver a descargarlo.
+# Si la descarga tuvo errores en los detalles, se reintenta mucho antes.
+DATASET_TTL = 3600
+PARTIAL_DATASET_TTL = 60
+
+# Errores del backend de Places que se reportan como 502
+UPSTREAM_ERRORS = (
+    googlemaps.exceptions.ApiError,
+    googlemaps.exceptions.HTTPError,
+    googlemaps.exceptions.Timeout,
+    googlemaps.exceptions.TransportError,
+)
+
+EARTH_RADIUS_M = 6371000.0
+
+
+class ServiceError(Exception):
+    """Error de petición que se devuelve al cliente con su código HTTP"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class SpatialIndex:
+    """Índice de rejilla sobre lat/lng para consultas por área"""
+
+    def __init__(self, lats, lngs, cell_size_m=500):
+        """
+        Args:
+            lats: Arreglo de latitudes
+            lngs: Arreglo de longitudes
+            cell_size_m: Tamaño aproximado de cada celda en metros
+        """
+        self.lats = np.asarray(lats, dtype=float)
+        self.lngs = np.asarray(lngs, dtype=float)
+        self.cell_deg = cell_size_m / 111320.0
+        self.cells = {}
+
+        rows = np.floor(self.lats / self.cell_deg).astype(int)
+        cols = np.floor(self.lngs / self.cell_deg).astype(int)
+        for pos, cell in enumerate(zip(rows.tolist(), cols.tolist())):
+            self.cells.setdefault(cell, []).append(pos)
+        self.cells = {cell: np.array(pos) for cell, pos in self.cells.items()}
+
+    def query(self, lat, lng, radius):
+        """Regresa las posiciones de los puntos dentro del radio (metros)"""
+        if not self.cells:
+            return np.array([], dtype=int)
+
+        dlat = radius / 111320.0
+        dlng = radius / (111320.0 * max(math.cos(math.radians(lat)), 1e-6))
+        row_min = math.floor((lat - dlat) / self.cell_deg)
+        row_max = math.floor((lat + dlat) / self.cell_deg)
+        col_min = math.floor((lng - dlng) / self.cell_deg)
+        col_max = math.floor((lng + dlng) / self.cell_deg)
+
+        # Si el área cubre más celdas de las que existen, revisar todo
+        if (row_max - row_min + 1) * (col_max - col_min + 1) > len(self.cells):
+            candidates = np.arange(len(self.lats))
+        else:
+            found = [
+                self.cells[(r, c)]
+                for r in range(row_min, row_max + 1)
+                for c in range(col_min, col_max + 1)
+                if (r, c) in self.cells
+            ]
+            if not found:
+                return np.array([], dtype=int)
+            candidates = np.concatenate(found)
+
+        distances = haversine(lat, lng, self.lats[candidates], self.lngs[candidates])
+        return np.sort(candidates[distances <= radius])
+
+
+def haversine(lat, lng, lats, lngs):
+    """Distancia en metros de un punto a un arreglo de puntos"""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def to_records(df):
+    """Convierte un DataFrame a una lista de dicts serializables"""
+    return json.loads(df[PUBLIC_COLUMNS].to_json(orient='records', force_ascii=False))
+
+
+class WarmDataset:
+    """Datos de una búsqueda con sus artefactos derivados en memoria"""
+
+    def __init__(self, analyzer, max_entries=MAX_CACHE_ENTRIES):
+        self.analyzer = analyzer
+        self.df = analyzer.df
+        if self.df.empty:
+            self.index = SpatialIndex([], [])
+        else:
+            self.index = SpatialIndex(self.df['lat'], self.df['lng'])
+        self.loaded_at = time.monotonic()
+        # Una descarga con errores en los detalles queda incompleta
+        self.partial = analyzer.detail_errors > 0
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+
+    def expired(self, ttl, partial_ttl):
+        """Indica si el dataset debe volver a descargarse"""
+        age = time.monotonic() - self.loaded_at
+        return age > (partial_ttl if self.partial else ttl)
+
+    def _cached(self, key, compute):
+        """Cache LRU acotada de resultados derivados"""
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        value = self._cache[key] = compute()
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return value
+
+    def _subset(self, subset, n):
+        if subset == 'top':
+            return self.analyzer.rank_top(n)
+        if subset == 'worst':
+            return self.analyzer.rank_worst(n)
+        if subset == 'all':
+            return self.df
+        raise ServiceError(400, f"Subconjunto inválido: {subset}")
+
+    def ranking(self, subset, n):
+        """Mejores o peores N negocios"""
+        return self._cached(('ranking', subset, n), lambda: to_records(self._subset(subset, n)))
+
+    def heatmap(self, subset, n):
+        """Puntos [lat, lng, peso] para una capa HeatMap de folium"""
+        def compute():
+            df = self._subset(subset, n)
+            return df[['lat', 'lng', 'total_ratings']].astype(float).values.tolist()
+        return self._cached(('heatmap', subset, n), compute)
+
+    def words(self, subset, n, limit):
+        """Palabras más frecuentes en las reviews del subconjunto"""
+        def compute():
+            counts = self.analyzer.get_word_frequencies(self._subset(subset, n))
+            return counts.most_common(limit)
+        return self._cached(('words', subset, n, limit), compute)
+
+    def stats(self, area=None):
+        """Estadísticas de los negocios dentro de un área (o de todos)"""
+        def compute():
+            df = self.df
+            if area is not None:
+                df = df.iloc[self.index.query(*area)]
+            rated = df[df['rating'] > 0]
+            histogram = np.histogram(rated['rating'], bins=[1, 2, 3, 4, 5.01])[0]
+            return {
+                'businesses': int(len(df)),
+                'rated': int(len(rated)),
+                'mean_rating': round(float(rated['rating'].mean()), 3) if len(rated) else None,
+                'median_rating': round(float(rated['rating'].median()), 3) if len(rated) else None,
+                'total_ratings': int(df['total_ratings'].sum()) if len(df) else 0,
+                'rating_histogram': dict(zip(['1-2', '2-3', '3-4', '4-5'], histogram.tolist())),
+            }
+        return self._cached(('stats', area), compute)
+
+
+class AnalyzerService:
+    """Mantiene datasets calientes y une peticiones concurrentes idénticas"""
+
+    def __init__(self, api_key, base_url=None, max_results=60, max_datasets=32,
+                 ttl=DATASET_TTL, partial_ttl=PARTIAL_DATASET_TTL,
+                 cache_entries=MAX_CACHE_ENTRIES):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_results = max_results
+        self.max_datasets = max_datasets
+        self.ttl = ttl
+        self.partial_ttl = partial_ttl
+        self.cache_entries = cache_entries
+        self._datasets = OrderedDict()
+        self._inflight = {}
+
+    def _collect(self, query, location, radius):
+        """Descarga los datos de una búsqueda (se ejecuta en un hilo)"""
+        analyzer = GoogleMapsAnalyzer(self.api_key, base_url=self.base_url)
+        analyzer.search_places(query, location, radius, max_results=self.max_results)
+        analyzer.collect_detailed_data()
+        return WarmDataset(analyzer, self.cache_entries)
+
+    async def _load(self, key, query, location, radius):
+        loop = asyncio.get_running_loop()
+        try:
+            dataset = await loop.run_in_executor(None, self._collect, query, location, radius)
+        finally:
+            self._inflight.pop(key, None)
+
+        self._datasets[key] = dataset
+        while len(self._datasets) > self.max_datasets:
+            self._datasets.popitem(last=False)
+        return dataset
+
+    async def get_dataset(self, query, location, radius):
+        """
+        Regresa el dataset de una búsqueda, descargándolo sólo si no está
+        en memoria o ya expiró. Peticiones simultáneas de la misma búsqueda
+        comparten una sola descarga.
+        """
+        key = (query.strip().lower(), round(location[0], 6), round(location[1], 6), int(radius))
+
+        dataset = self._datasets.get(key)
+        if dataset is not None:
+            if not dataset.expired(self.ttl, self.partial_ttl):
+                self._datasets.move_to_end(key)
+                return dataset
+            del self._datasets[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, query, location, radius))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def handle(self, path, params):
+        """Resuelve una ruta de la API y regresa el payload JSON"""
+        if path == '/health':
+            return {'status': 'ok', 'datasets': len(self._datasets), 'inflight': len(self._inflight)}
+
+        routes = {
+            '/top': lambda ds: ds.ranking('top', n),
+            '/worst': lambda ds: ds.ranking('worst', n),
+            '/heatmap': lambda ds: ds.heatmap(get_str(params, 'subset', 'top'), n),
+            '/words': lambda ds: ds.words(get_str(params, 'subset', 'top'), n, limit),
+            '/stats': lambda ds: ds.stats(area),
+        }
+        if path not in routes:
+            raise ServiceError(404, f"Ruta no encontrada: {path}")
+
+        # Se validan todos los parámetros antes de descargar nada
+        n = get_number(params, 'n', 15, int, minimum=1)
+        limit = get_number(params, 'limit', 50, int, minimum=1)
+        area = get_area(params)
+        if get_str(params, 'subset', 'top') not in SUBSETS:
+            raise ServiceError(400, f"Subconjunto inválido: {params['subset'][0]} (usa top, worst o all)")
+        query = get_str(params, 'query', DEFAULT_QUERY)
+        location = (get_number(params, 'lat', DEFAULT_LOCATION[0], float),
+                    get_number(params, 'lng', DEFAULT_LOCATION[1], float))
+        radius = get_number(params, 'radius', DEFAULT_RADIUS, int, minimum=1)
+
+        dataset = await self.get_dataset(query, location, radius)
+        return {'query': query, 'location': location, 'radius': radius,
+                'result': routes[path](dataset)}
+
+
+def get_str(params, name, default):
+    values = params.get(name)
+    return values[0] if values else default
+
+
+def get_number(params, name, default, kind, minimum=None):
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        value = kind(values[0])
+    except ValueError:
+        raise ServiceError(400, f"Parámetro inválido '{name}': {values[0]}")
+    if not math.isfinite(value) or (minimum is not None and value < minimum):
+        raise ServiceError(400, f"Parámetro fuera de rango '{name}': {values[0]}")
+    return value
+
+
+AREA_PARAMS = ('area_lat', 'area_lng', 'area_radius')
+
+
+def get_area(params):
+    """Área (lat, lng, radio) opcional para /stats"""
+    given = [name for name in AREA_PARAMS if name in params]
+    if not given:
+        return None
+    if 'area_lat' not in given or 'area_lng' not in given:
+        raise ServiceError(400, "Para filtrar por área se requieren area_lat y area_lng")
+    return (get_number(params, 'area_lat', None, float),
+            get_number(params, 'area_lng', None, float),
+            get_number(params, 'area_radius', 1000, float, minimum=0))
+
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 500: 'Internal Server Error', 502: 'Bad Gateway'}
+
+
+async def handle_connection(service, reader, writer):
+    """Atiende una petición HTTP/1.1 y cierra la conexión"""
+    try:
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+
+        try:
+            parts = request_line.split(' ')
+            if len(parts) != 3:
+                raise ServiceError(400, f"Petición inválida: {request_line}")
+            method, target, _ = parts
+            if method != 'GET':
+                raise ServiceError(405, f"Método no soportado: {method}")
+            url = urlsplit(target)
+            payload = await service.handle(url.path, parse_qs(url.query))
+            status = 200
+        except ServiceError as e:
+            status, payload = e.status, {'error': e.message}
+        except UPSTREAM_ERRORS as e:
+            status, payload = 502, {'error': f"Error obteniendo datos: {e}"}
+        except Exception:
+            traceback.print_exc()
+            status, payload = 500, {'error': "Error interno del servicio"}
+
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(
+        lambda r, w: handle_connection(service, r, w), host, port
+    )
+    print(f"🌐 Servicio escuchando en http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON del analizador de Google Maps")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--base-url', default=os.getenv('GOOGLE_MAPS_BASE_URL'),
+                        help="Backend de Places alternativo (ej: servidor falso local)")
+    parser.add_argument('--max-results', type=int, default=60)
+    parser.add_argument('--ttl', type=int, default=DATASET_TTL,
+                        help="Segundos antes de volver a descargar una búsqueda")
+    args = parser.parse_args()
+
+    api_key = os.getenv('GOOGLE_MAPS_API_KEY')
+    if not api_key:
+        print("❌ ERROR: No se encontró GOOGLE_MAPS_API_KEY en el archivo .env")
+        return
+
+    service = AnalyzerService(api_key, base_url=args.base_url, max_results=args.max_results,
+                              ttl=args.ttl)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 Servicio detenido")
+
+
+if __name__ == "__main__":
+    main()
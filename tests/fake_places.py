@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Backend falso de Google Places para probar el servicio sin consumir la API
+Responde nearbysearch y details con negocios fijos y cuenta las peticiones.
+
+Uso manual:
+    python3 tests/fake_places.py --port 9000
+    GOOGLE_MAPS_API_KEY=AIzaFakeKeyForTests python3 servidor.py --base-url http://127.0.0.1:9000
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+FAKE_API_KEY = 'AIzaFakeKeyForTests'
+
+PLACES = [
+    {'place_id': 'p1', 'name': 'Tacos El Güero', 'rating': 4.8, 'user_ratings_total': 320,
+     'lat': 25.6870, 'lng': -100.3160, 'types': ['restaurant', 'food'],
+     'reviews': ['Los mejores tacos y postres de la zona', 'Excelente atención, tacos deliciosos']},
+    {'place_id': 'p2', 'name': 'Café Central', 'rating': 4.5, 'user_ratings_total': 150,
+     'lat': 25.6890, 'lng': -100.3120, 'types': ['cafe', 'food'],
+     'reviews': ['Great coffee and friendly staff', 'Buen café, postre rico']},
+    {'place_id': 'p3', 'name': 'Fonda Doña Mary', 'rating': 3.9, 'user_ratings_total': 80,
+     'lat': 25.6820, 'lng': -100.3200, 'types': ['restaurant', 'food'],
+     'reviews': ['Comida casera, precios justos']},
+    {'place_id': 'p4', 'name': 'Burger Express', 'rating': 2.1, 'user_ratings_total': 45,
+     'lat': 25.6950, 'lng': -100.3050, 'types': ['restaurant', 'food'],
+     'reviews': ['Servicio lento y comida fría', 'Muy sucio, no regreso']},
+    {'place_id': 'p5', 'name': 'Pizzería Napoli', 'rating': 2.8, 'user_ratings_total': 60,
+     'lat': 25.6800, 'lng': -100.3300, 'types': ['restaurant'],
+     'reviews': ['La pizza llegó fría', 'Cold pizza and slow service']},
+]
+
+
+class FakePlacesBackend:
+    """Servidor HTTP en un hilo que imita las rutas de Places usadas por main.py"""
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0, places=PLACES, failing_details=()):
+        """
+        Args:
+            port: Puerto de escucha (0 = cualquiera libre)
+            delay: Segundos de espera en cada nearbysearch, para simular
+                latencia y poder lanzar peticiones concurrentes
+            failing_details: place_id cuyos detalles responden con error
+        """
+        self.delay = delay
+        self.failing_details = set(failing_details)
+        self.places = {place['place_id']: place for place in places}
+        self.calls = {'nearby': 0, 'details': 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = parse_qs(url.query)
+                if url.path.endswith('/nearbysearch/json'):
+                    body = backend.nearby()
+                elif url.path.endswith('/details/json'):
+                    place_id = (params.get('placeid') or params.get('place_id') or [''])[0]
+                    body = backend.details(place_id)
+                else:
+                    body = {'status': 'INVALID_REQUEST'}
+
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def _count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    def nearby(self):
+        self._count('nearby')
+        time.sleep(self.delay)
+        results = [
+            {
+                'place_id': p['place_id'], 'name': p['name'], 'rating': p['rating'],
+                'user_ratings_total': p['user_ratings_total'], 'types': p['types'],
+                'geometry': {'location': {'lat': p['lat'], 'lng': p['lng']}},
+            }
+            for p in self.places.values()
+        ]
+        return {'status': 'OK', 'results': results}
+
+    def details(self, place_id):
+        self._count('details')
+        place = self.places.get(place_id)
+        if place is None or place_id in self.failing_details:
+            return {'status': 'NOT_FOUND'}
+        return {'status': 'OK', 'result': {
+            'name': place['name'],
+            'formatted_address': f"Calle {place_id}, Monterrey",
+            'geometry': {'location': {'lat': place['lat'], 'lng': place['lng']}},
+            'reviews': [
+                {'text': text, 'language': 'es', 'rating': round(place['rating']),
+                 'time': 1700000000 + i, 'author_name': f'autor{i}'}
+                for i, text in enumerate(place['reviews'])
+            ],
+        }}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backend falso de Google Places")
+    parser.add_argument('--port', type=int, default=9000)
+    args = parser.parse_args()
+
+    backend = FakePlacesBackend(port=args.port).start()
+    print(f"🧪 Backend falso de Places en {backend.base_url} (API key: {FAKE_API_KEY})")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        backend.stop()
@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import corpus as corpus_module
+from corpus import ReviewCorpus, ReviewCorpusWriter, _append_npy, _merge_sorted_npy
+
+
+def review(text, time, rating=5):
+    return {'text': text, 'language': 'es', 'rating': rating, 'time': time}
+
+
+BUSINESSES = pd.DataFrame({
+    'place_id': ['p1', 'p2'],
+    'name': ['Tacos El Güero', 'Café Central'],
+    'reviews': [
+        [review('Los mejores tacos y postres', 1), review('Excelente atención', 2)],
+        [review('Buen café, postre rico', 1), review('Servicio lento', 2, rating=2)],
+    ],
+})
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / 'corpus')
+
+
+def save(directory, businesses=BUSINESSES):
+    with ReviewCorpusWriter(directory) as writer:
+        return writer.add_businesses(businesses)
+
+
+def test_saving_same_reviews_again_does_not_duplicate(directory):
+    assert save(directory) == 4
+    with ReviewCorpus(directory) as corpus:
+        counts = corpus.word_counts()
+
+    assert save(directory) == 0
+    newer = BUSINESSES.copy()
+    newer.loc[0, 'reviews'] = BUSINESSES.loc[0, 'reviews'] + [review('Tacos muy buenos', 3)]
+    assert save(directory, newer) == 1
+
+    with ReviewCorpus(directory) as corpus:
+        assert len(corpus) == 5
+        assert corpus.word_counts()['postre'] == counts['postre'] == 2
+        assert corpus.word_counts()['taco'] == counts['taco'] + 1
+
+
+def test_corpus_without_keys_is_deduplicated(directory):
+    save(directory)
+    # Corpus guardado antes de que existiera key.npy
+    os.remove(os.path.join(directory, 'key.npy'))
+
+    assert save(directory) == 0
+    with ReviewCorpus(directory) as corpus:
+        assert len(corpus) == 4
+
+
+def test_columns_are_appended_in_place(directory):
+    save(directory)
+    size = os.path.getsize(os.path.join(directory, 'place.npy'))
+    newer = BUSINESSES.copy()
+    newer.loc[1, 'reviews'] = BUSINESSES.loc[1, 'reviews'] + [review('Postres caros', 3)]
+    save(directory, newer)
+
+    with ReviewCorpus(directory) as corpus:
+        assert len(corpus) == len(corpus.place) == len(corpus.language) == 5
+        assert corpus.review(4) == 'Postres caros'
+        assert corpus.metadata([4]).iloc[0].to_dict() == {
+            'place_id': 'p2', 'rating': 5, 'language': 'es', 'time': 3,
+        }
+    keys = np.load(os.path.join(directory, 'key.npy'))
+    assert len(keys) == 5 and (np.diff(keys) > 0).all()
+    # El encabezado conserva su longitud: el archivo sólo crece una fila
+    assert os.path.getsize(os.path.join(directory, 'place.npy')) == size + np.dtype('i').itemsize
+
+
+def test_append_npy_discards_rows_of_interrupted_writes(tmp_path):
+    filename = str(tmp_path / 'columna.npy')
+    _append_npy(filename, [1, 2, 3], np.int64)
+    _append_npy(filename, [4, 5], np.int64)
+    assert np.load(filename).tolist() == [1, 2, 3, 4, 5]
+
+    _append_npy(filename, [9], np.int64, rows=3)
+    assert np.load(filename).tolist() == [1, 2, 3, 9]
+
+
+def test_merge_sorted_npy_by_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(corpus_module, 'CHUNK_ROWS', 3)
+    filename = str(tmp_path / 'key.npy')
+    rng = np.random.default_rng(0)
+    first, second = rng.integers(-1000, 1000, 20), rng.integers(-1000, 1000, 7)
+
+    _merge_sorted_npy(filename, first)
+    _merge_sorted_npy(filename, second)
+
+    assert np.load(filename).tolist() == sorted(first.tolist() + second.tolist())
+
+
+def test_search_matches_singular_and_plural(directory):
+    save(directory)
+    with ReviewCorpus(directory) as corpus:
+        found = corpus.search('postre')
+        assert [corpus.review(i) for i in found] == ['Los mejores tacos y postres', 'Buen café, postre rico']
+        assert list(corpus.search('Postres')) == list(found)
+
+        worst = corpus.select_places(['p2'])
+        assert list(corpus.search('postre', worst)) == [found[1]]
+        assert list(corpus.search('postre', [1, 3])) == []
+        assert list(corpus.search('postre', [])) == []
+
+
+def test_token_chunks_are_views_released_before_close(directory):
+    save(directory)
+    corpus = ReviewCorpus(directory)
+    chunks = list(corpus._token_chunks(chunk_bytes=16))
+    assert all(isinstance(chunk, memoryview) for chunk in chunks)
+    assert b''.join(bytes(chunk) for chunk in chunks) == corpus.tokens[:]
+    for chunk in chunks:
+        chunk.release()
+
+    worst = corpus.select_places(['p2'])
+    assert corpus.word_counts(worst)['lento'] == 1
+    assert corpus.word_counts(corpus.select_places(['desconocido'])) == {}
+    # Sin vistas pendientes el mmap se cierra sin BufferError
+    corpus.close()
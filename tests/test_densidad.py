@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from densidad import EXPORT_RELATIVE_MIN, analyze_density
+
+
+CENTER = (25.6866142, -100.3161126)
+
+
+def businesses(n, radius, seed=0):
+    """Negocios al azar dentro del radio, como los de una búsqueda de main()"""
+    rng = np.random.default_rng(seed)
+    distance = radius * np.sqrt(rng.random(n))
+    angle = rng.random(n) * 2 * np.pi
+    return pd.DataFrame({
+        'lat': CENTER[0] + np.degrees(distance * np.sin(angle) / 6371000),
+        'lng': CENTER[1] + np.degrees(distance * np.cos(angle) / (6371000 * np.cos(np.radians(CENTER[0])))),
+        'rating': rng.uniform(2, 5, n).round(1),
+        'total_ratings': rng.integers(5, 2000, n),
+    })
+
+
+def test_default_search_has_rated_and_opportunity_cells():
+    surfaces = analyze_density(businesses(60, 5000), CENTER, 5000)
+
+    # Alrededor de cada negocio aislado hay celdas con rating promedio
+    assert np.isfinite(surfaces.avg_rating).sum() > 60 * 20
+    assert surfaces.opportunity.any()
+    assert surfaces.undersupplied.any()
+
+
+def test_single_business_is_supported_near_its_cell():
+    single = pd.DataFrame({'lat': [CENTER[0]], 'lng': [CENTER[1]], 'rating': [3.0], 'total_ratings': [10]})
+    surfaces = analyze_density(single, CENTER, 1000)
+
+    rated = np.isfinite(surfaces.avg_rating)
+    assert rated.sum() > 1
+    assert np.allclose(surfaces.avg_rating[rated], 3.0)
+
+
+def test_exported_layers_skip_kernel_tail_and_are_capped():
+    surfaces = analyze_density(businesses(60, 5000), CENTER, 5000)
+    density = surfaces.to_dataframe('density')
+
+    assert len(density) < surfaces.grid.size ** 2 * 0.7
+    assert density['value'].min() > EXPORT_RELATIVE_MIN * surfaces.density.max()
+
+    wide = analyze_density(businesses(2000, 50000), CENTER, 50000)
+    for name in wide.SURFACES:
+        assert len(wide.to_dataframe(name, max_points=5000)) == 5000
+    capped = wide.to_dataframe('review_volume', max_points=5000)
+    assert capped['value'].min() >= np.sort(wide.review_volume.ravel())[-5000]
+    assert len(wide.opportunity_cells(max_points=100)) == 100
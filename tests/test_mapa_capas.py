@@ -0,0 +1,66 @@
+import json
+import os
+import re
+
+import pandas as pd
+
+from mapa_capas import LayeredMap
+
+
+BUSINESSES = pd.DataFrame({
+    'name': ['Tacos <El Güero>', 'Café Central', 'Burger Express'],
+    'rating': [4.8, 4.5, 2.1],
+    'total_ratings': [320, 150, 45],
+    'lat': [25.6871234, 25.6891234, 25.6951234],
+    'lng': [-100.3161234, -100.3121234, -100.3051234],
+    'types': ['restaurant, food', 'cafe, food', 'restaurant'],
+})
+
+
+def lazy_layer_specs(page):
+    """Especificaciones de capas que LazyLayers escribe en el HTML"""
+    return json.loads(re.search(r'var specs = (\[.*?\]);', page).group(1))
+
+
+def test_save_writes_one_side_file_per_layer(tmp_path):
+    layered = LayeredMap('Prueba')
+    layered.add_layer('Todos (calor)', BUSINESSES, show=True)
+    layered.add_layer('Todos', BUSINESSES, kind='markers', color='green')
+    layered.add_layer('Todos', BUSINESSES, kind='markers', color='red')
+    layered.add_layer('Vacía', BUSINESSES.iloc[0:0])
+    layered.add_layer('Tipo: <b>food</b>', BUSINESSES.iloc[:2])
+
+    filename = tmp_path / 'mapa.html'
+    layers_dir = layered.save(str(filename))
+    page = filename.read_text(encoding='utf-8')
+    specs = lazy_layer_specs(page)
+
+    # La capa vacía se omite y las etiquetas repetidas tienen ids distintos
+    assert len(specs) == 4
+    assert len({spec['id'] for spec in specs}) == 4
+    assert sorted(os.listdir(layers_dir)) == sorted(f"{spec['id']}.js" for spec in specs)
+
+    for spec in specs:
+        assert spec['src'] == f"mapa_capas/{spec['id']}.js"
+        assert (tmp_path / spec['src']).exists()
+
+    # Los puntos sólo están en los archivos de capa
+    assert '25.687123' not in page
+    heat = (tmp_path / specs[0]['src']).read_text(encoding='utf-8')
+    assert heat.startswith(f'registerLazyLayer("{specs[0]["id"]}",')
+    assert '25.687123' in heat
+
+    assert page.count('leaflet_heat') == 1
+
+    labels = [spec['label'] for spec in specs]
+    assert 'Tipo: &lt;b&gt;food&lt;/b&gt;' in labels
+    markers = (tmp_path / specs[1]['src']).read_text(encoding='utf-8')
+    assert 'Tacos &lt;El Güero&gt;' in markers
+
+
+def test_save_without_data_writes_nothing(tmp_path):
+    layered = LayeredMap('Prueba')
+    layered.add_layer('Vacía', BUSINESSES.iloc[0:0])
+
+    assert layered.save(str(tmp_path / 'mapa.html')) is None
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+import pytest
+
+import servidor
+from fake_places import FAKE_API_KEY, FakePlacesBackend
+
+
+@pytest.fixture
+def backend():
+    with FakePlacesBackend(delay=0.3) as fake:
+        yield fake
+
+
+async def request(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, body = data.split(b'\r\n\r\n', 1)
+    status = int(head.split(b' ')[1])
+    return status, json.loads(body)
+
+
+def run_against_service(backend, scenario, **options):
+    """Levanta el servicio en un puerto libre y ejecuta scenario(port, service)"""
+    async def main():
+        service = servidor.AnalyzerService(FAKE_API_KEY, base_url=backend.base_url, **options)
+        server = await asyncio.start_server(
+            lambda r, w: servidor.handle_connection(service, r, w), '127.0.0.1', 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await scenario(port, service)
+    return asyncio.run(main())
+
+
+def test_concurrent_cold_requests_share_one_fetch(backend):
+    async def scenario(port, service):
+        return await asyncio.gather(*[request(port, '/top?n=3') for _ in range(5)])
+
+    responses = run_against_service(backend, scenario)
+
+    assert backend.calls['nearby'] == 1
+    assert backend.calls['details'] == len(backend.places)
+    assert all(status == 200 for status, _ in responses)
+    names = [[row['name'] for row in body['result']] for _, body in responses]
+    assert names == [names[0]] * 5
+    assert names[0][0] == 'Tacos El Güero'
+
+
+def test_routes_reuse_warm_dataset(backend):
+    async def scenario(port, service):
+        results = {}
+        for path in ('/worst?n=2', '/heatmap?subset=all', '/words?subset=top&limit=5',
+                     '/stats', '/stats?area_lat=25.687&area_lng=-100.316&area_radius=500'):
+            results[path] = await request(port, path)
+        return results
+
+    results = run_against_service(backend, scenario)
+
+    assert backend.calls['nearby'] == 1
+    assert all(status == 200 for status, _ in results.values())
+    assert [r['name'] for r in results['/worst?n=2'][1]['result']] == ['Burger Express', 'Pizzería Napoli']
+    assert len(results['/heatmap?subset=all'][1]['result']) == 5
+    assert results['/stats'][1]['result']['businesses'] == 5
+    area = results['/stats?area_lat=25.687&area_lng=-100.316&area_radius=500'][1]['result']
+    assert area['businesses'] == 2
+    assert 'taco' in dict(results['/words?subset=top&limit=5'][1]['result'])
+
+
+@pytest.mark.parametrize('path', [
+    '/stats?area_lat=25.68',
+    '/stats?area_radius=300',
+    '/top?n=-1',
+    '/top?n=0',
+    '/words?limit=0',
+    '/top?radius=abc',
+    '/heatmap?subset=bad',
+])
+def test_invalid_parameters_are_client_errors(backend, path):
+    async def scenario(port, service):
+        return await request(port, path)
+
+    status, body = run_against_service(backend, scenario)
+
+    assert status == 400
+    assert 'error' in body
+    # Los parámetros se validan antes de consultar el backend
+    assert backend.calls['nearby'] == 0
+
+
+def test_expired_dataset_is_fetched_again(backend):
+    async def scenario(port, service):
+        await request(port, '/top')
+        await request(port, '/top')
+        return await request(port, '/health')
+
+    run_against_service(backend, scenario, ttl=0)
+
+    assert backend.calls['nearby'] == 2
+
+
+def test_derived_cache_is_bounded(backend):
+    async def scenario(port, service):
+        for i in range(10):
+            await request(port, f'/stats?area_lat=25.68&area_lng=-100.31&area_radius={100 + i}')
+        return next(iter(service._datasets.values()))
+
+    dataset = run_against_service(backend, scenario, cache_entries=4)
+
+    assert len(dataset._cache) == 4
+
+
+def test_partial_dataset_is_refreshed_sooner():
+    async def scenario(port, service):
+        await request(port, '/top')
+        partial = next(iter(service._datasets.values())).partial
+        await request(port, '/top')
+        return partial
+
+    with FakePlacesBackend(failing_details=['p3']) as backend:
+        partial = run_against_service(backend, scenario, ttl=3600, partial_ttl=0)
+
+    assert partial
+    assert backend.calls['nearby'] == 2
+
+
+def test_search_without_results_returns_empty_data():
+    async def scenario(port, service):
+        results = {}
+        for path in ('/top', '/worst', '/heatmap?subset=all', '/words', '/stats',
+                     '/stats?area_lat=25.687&area_lng=-100.316&area_radius=500'):
+            results[path] = await request(port, path)
+        return results
+
+    with FakePlacesBackend(places=[]) as backend:
+        results = run_against_service(backend, scenario)
+
+    assert all(status == 200 for status, _ in results.values())
+    for path in ('/top', '/worst', '/heatmap?subset=all', '/words'):
+        assert results[path][1]['result'] == []
+    stats = results['/stats'][1]['result']
+    assert stats['businesses'] == stats['rated'] == stats['total_ratings'] == 0
+    assert stats['mean_rating'] is None
+    assert results['/stats?area_lat=25.687&area_lng=-100.316&area_radius=500'][1]['result']['businesses'] == 0
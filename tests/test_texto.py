@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from texto import (
+    build_review_table, fold_text, normalize_reviews, stem_word, surface_forms,
+    with_surface_forms, word_frequencies,
+)
+
+
+def test_fold_text_removes_accents_urls_and_emojis():
+    folded = fold_text(pd.Series([
+        '¡Excelente! 😍 https://x.com café',
+        'Ñandú   CORAZÓN\nwww.ejemplo.mx/menu ﬁno',
+        None,
+    ]))
+
+    assert folded.tolist() == ['excelente cafe', 'nandu corazon fino', '']
+
+
+@pytest.mark.parametrize('word, stem', [
+    ('postres', 'postre'),
+    ('calles', 'calle'),
+    ('dulces', 'dulce'),
+    ('meses', 'mes'),
+    ('grandes', 'grande'),
+    ('clases', 'clase'),
+    ('tacos', 'taco'),
+    ('mejores', 'mejor'),
+    ('lugares', 'lugar'),
+    ('ciudades', 'ciudad'),
+    ('atenciones', 'atencion'),
+    ('veces', 'vez'),
+    ('luces', 'luz'),
+    ('relojes', 'reloj'),
+    ('leyes', 'ley'),
+])
+def test_spanish_plurals_stem_to_singular(word, stem):
+    assert stem_word(word, 'es') == stem
+    # El singular no cambia, así que plural y singular se cuentan juntos
+    assert stem_word(stem, 'es') == stem
+
+
+def reviews(*texts, language='es'):
+    businesses = pd.DataFrame({
+        'name': ['Negocio'],
+        'reviews': [[{'text': text, 'language': language, 'rating': 5, 'time': 0} for text in texts]],
+    })
+    return normalize_reviews(build_review_table(businesses))
+
+
+def test_ngrams_do_not_cross_review_boundaries():
+    table = reviews('Comida deliciosa', 'Servicio lento', 'La comida es muy buena y barata')
+
+    bigrams = word_frequencies(table, n=2)
+    # Las stopwords se quitan antes de formar los n-gramas
+    assert bigrams == {'comida deliciosa': 1, 'servicio lento': 1,
+                       'comida buena': 1, 'buena barata': 1}
+    assert 'deliciosa servicio' not in bigrams
+    assert word_frequencies(table, n=3) == {'comida buena barata': 1}
+
+
+def test_plural_stopwords_are_filtered():
+    counts = word_frequencies(reviews('Porciones grandes y postres grandes'))
+
+    assert 'grande' not in counts
+    assert 'grand' not in counts
+    assert counts['postre'] == 1
+
+
+def test_surface_forms_restore_original_words():
+    table = reviews('Excelente atención y postres', 'La atención es buena, buen postre',
+                    'Dulces típicos, atencion rápida, postres caseros')
+    forms = surface_forms(table)
+
+    assert forms['atencion'] == 'atención'
+    assert forms['postre'] == 'postres'
+    assert forms['dulce'] == 'dulces'
+
+    display = with_surface_forms(word_frequencies(table), forms)
+    assert display['atención'] == 3
+    assert 'atencion' not in display
+
+    bigrams = with_surface_forms(word_frequencies(table, n=2), forms)
+    assert bigrams['excelente atención'] == 1
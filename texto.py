@@ -0,0 +1,256 @@
+"""
+Normalización y tokenización de reviews en español e inglés
+Todo el procesamiento se hace en bloque con operaciones de texto de pandas
+y expresiones regulares precompiladas. El resultado se guarda en la tabla
+de reviews para que word clouds, conteos y demás análisis lo reutilicen.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+
+import pandas as pd
+
+
+# Palabras comunes a excluir (stopwords en español e inglés)
+STOPWORDS = set([
+    # Spanish
+    'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'ser', 'se', 'no',
+    'haber', 'por', 'con', 'su', 'para', 'como', 'estar', 'tener',
+    'le', 'lo', 'todo', 'pero', 'más', 'hacer', 'o', 'poder', 'decir',
+    'este', 'ir', 'otro', 'ese', 'si', 'me', 'ya', 'ver', 'porque',
+    'dar', 'cuando', 'él', 'muy', 'sin', 'vez', 'mucho', 'saber',
+    'qué', 'sobre', 'mi', 'alguno', 'mismo', 'yo', 'también', 'hasta',
+    'año', 'dos', 'querer', 'entre', 'así', 'primero', 'desde', 'grande',
+    'eso', 'ni', 'nos', 'llegar', 'pasar', 'tiempo', 'ella', 'sí',
+    'día', 'uno', 'bien', 'poco', 'deber', 'entonces', 'poner', 'cosa',
+    'tanto', 'hombre', 'parecer', 'nuestro', 'tan', 'donde', 'ahora',
+    'parte', 'después', 'vida', 'quedar', 'siempre', 'creer', 'hablar',
+    'llevar', 'dejar', 'nada', 'cada', 'seguir', 'menos', 'nuevo', 'encontrar',
+    'algo', 'solo', 'fue',
+    'los', 'las', 'del', 'al', 'una', 'unos', 'unas', 'les', 'son', 'era',
+    'esta', 'estos', 'estas', 'han', 'hay', 'pues', 'aunque', 'sus', 'tus',
+    
+    # English (existing + new)
+    'the', 'and', 'is', 'it', 'to', 'of', 'was', 'for', 'on', 'are', 'with',
+    'as', 'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves',
+    'you', 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself',
+    'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them', 'their',
+    'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this', 'that', 'these',
+    'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has',
+    'had', 'having', 'do', 'does', 'did', "didn't", "don't", 'doing', 'a', 'an', 'the', 'and', 
+    'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with',
+    'about', 'against', 'between', 'into', 'through', 'during', 'before', 'after',
+    'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over',
+    'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where',
+    'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other',
+    'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too',
+    'very', 's', 't', 'can', 'will', 'just', 'don', 'should', 'now',
+    'didn', 'doesn', 'isn', 'wasn', 'won', 've', 'll', 're'
+])
+
+# Expresiones precompiladas para la limpieza en bloque
+URL_RE = re.compile(r'https?://\S+|www\.\S+')
+ACCENT_RE = re.compile(r'[\u0300-\u036f]')
+# Después de quitar acentos, todo lo que no sea letra o número
+# (emojis, puntuación, símbolos) se reemplaza por espacio
+NON_WORD_RE = re.compile(r'[^a-z0-9\s]+')
+SPACES_RE = re.compile(r'\s+')
+# Para las formas originales: se conservan letras acentuadas
+SURFACE_NON_WORD_RE = re.compile(r'[^\w\s]+|[\d_]+')
+
+# Stemming ligero: lleva los plurales a su singular, por idioma.
+# Se aplica la primera regla que coincida.
+STEM_RULES = {
+    'es': [
+        # "-es" sólo se quita si queda una consonante que puede cerrar un
+        # singular tras vocal (mejor, ciudad, atencion, reloj, ley); si no,
+        # el singular termina en "e" (postres → postre, calles → calle)
+        (re.compile(r'(?<=[aeiou])ces$'), 'z'),            # veces → vez (dulces → dulce)
+        (re.compile(r'(?<=[aeiou][lnrdjy])es$'), ''),      # mejores → mejor
+        (re.compile(r'(?<=[eiou]s)es$'), ''),              # meses → mes (clases → clase)
+        (re.compile(r'(?<=[aeiou])s$'), ''),               # tacos → taco, postres → postre
+    ],
+    'en': [
+        (re.compile(r'ies$'), 'y'),                    # berries → berry
+        (re.compile(r'(ss|x|z|ch|sh)es$'), r'\1'),     # dishes → dish
+        (re.compile(r'(?<![su])s$'), ''),              # tables → table
+    ],
+}
+MIN_STEM_LENGTH = 5
+MIN_WORD_LENGTH = 3
+
+
+def fold_text(series):
+    """
+    Normaliza una serie de textos: NFKD, sin acentos, minúsculas, sin URLs
+    ni emojis y con espacios simples
+    """
+    text = series.fillna('').astype(str).str.normalize('NFKD')
+    text = text.str.replace(ACCENT_RE, '', regex=True).str.lower()
+    text = text.str.replace(URL_RE, ' ', regex=True)
+    text = text.str.replace(NON_WORD_RE, ' ', regex=True)
+    return text.str.replace(SPACES_RE, ' ', regex=True).str.strip()
+
+
+def fold_word(word):
+    """Versión de fold_text para una sola palabra"""
+    word = unicodedata.normalize('NFKD', word)
+    return ACCENT_RE.sub('', word).lower()
+
+
+def stem_word(word, language='es'):
+    """Stemming ligero de una palabra ya normalizada"""
+    if len(word) < MIN_STEM_LENGTH:
+        return word
+    for pattern, replacement in STEM_RULES.get(language, STEM_RULES['en']):
+        stemmed, count = pattern.subn(replacement, word)
+        if count:
+            return stemmed
+    return word
+
+
+def surface_forms(review_table):
+    """
+    Forma original más frecuente de cada token normalizado
+
+    Los tokens pierden acentos y plurales ("atencion", "taco"); para
+    mostrarlos (ej: en word clouds) se usa la palabra tal como la escribieron
+    más veces ("atención", "tacos").
+
+    Returns:
+        Diccionario {token: palabra original en minúsculas}
+    """
+    if review_table.empty:
+        return {}
+
+    text = review_table['text'].fillna('').astype(str).str.normalize('NFC').str.lower()
+    text = text.str.replace(URL_RE, ' ', regex=True)
+    text = text.str.replace(SURFACE_NON_WORD_RE, ' ', regex=True)
+    words = text.str.split().explode().dropna()
+    if words.empty:
+        return {}
+
+    lang = review_table['language'].reindex(words.index).fillna('es').str[:2]
+    lang = lang.where(lang.isin(list(STEM_RULES)), 'en')
+    counts = pd.DataFrame({'word': words.values, 'lang': lang.values}).value_counts()
+
+    best = {}
+    for (word, language), count in counts.items():
+        token = stem_word(NON_WORD_RE.sub('', fold_word(word)), language)
+        if token not in best or count > best[token][1]:
+            best[token] = (word, count)
+    return {token: word for token, (word, _) in best.items()}
+
+
+def with_surface_forms(frequencies, forms):
+    """Cambia las claves de un conteo (palabras o n-gramas) a su forma original"""
+    display = Counter()
+    for gram, count in frequencies.items():
+        display[' '.join(forms.get(token, token) for token in gram.split(' '))] += count
+    return display
+
+
+def _normalized_stopwords():
+    words = {fold_word(w) for w in STOPWORDS}
+    return frozenset(words | {stem_word(w, lang) for w in words for lang in STEM_RULES})
+
+
+# Stopwords con la misma normalización que los tokens
+NORMALIZED_STOPWORDS = _normalized_stopwords()
+
+
+def build_review_table(businesses_df):
+    """
+    Convierte la columna 'reviews' en una tabla con una fila por review
+
+    Returns:
+        DataFrame con columnas business (índice del negocio), text,
+        language, review_rating y time (epoch en segundos)
+    """
+    columns = ['business', 'text', 'language', 'review_rating', 'time']
+    if businesses_df.empty or 'reviews' not in businesses_df:
+        return pd.DataFrame(columns=columns)
+
+    reviews = businesses_df['reviews'].explode()
+    reviews = reviews[reviews.map(lambda r: isinstance(r, dict))]
+
+    table = pd.DataFrame({
+        'business': reviews.index,
+        'text': [r.get('text', '') for r in reviews],
+        'language': [r.get('language', 'es') for r in reviews],
+        'review_rating': [r.get('rating') for r in reviews],
+        'time': [r.get('time') for r in reviews],
+    }, columns=columns)
+    return table[table['text'].fillna('') != ''].reset_index(drop=True)
+
+
+def tokenize(normalized, languages):
+    """
+    Separa textos normalizados en tokens y aplica el stemming del idioma
+    de cada review. Cada palabra distinta se procesa una sola vez.
+    """
+    tokens = normalized.str.split(' ').explode()
+    tokens = tokens[tokens.fillna('').str.len() > 0]
+    if tokens.empty:
+        return pd.Series([[] for _ in range(len(normalized))], index=normalized.index)
+
+    lang = languages.reindex(tokens.index).fillna('es').str[:2]
+    lang = lang.where(lang.isin(list(STEM_RULES)), 'en')
+    pairs = pd.DataFrame({'word': tokens.values, 'lang': lang.values}, index=tokens.index)
+
+    unique = pairs.drop_duplicates()
+    stems = {(w, l): stem_word(w, l) for w, l in zip(unique['word'], unique['lang'])}
+    stemmed = pd.Series(
+        [stems[key] for key in zip(pairs['word'], pairs['lang'])], index=pairs.index
+    )
+
+    grouped = stemmed.groupby(level=0).agg(list)
+    return grouped.reindex(normalized.index).apply(lambda t: t if isinstance(t, list) else [])
+
+
+def normalize_reviews(review_table):
+    """
+    Agrega las columnas 'normalized' y 'tokens' a la tabla de reviews.
+    Si ya existen no se vuelven a calcular.
+    """
+    if 'tokens' in review_table:
+        return review_table
+
+    review_table = review_table.copy()
+    review_table['normalized'] = fold_text(review_table['text'])
+    review_table['tokens'] = tokenize(review_table['normalized'], review_table['language'])
+    return review_table
+
+
+def _content_tokens(token_lists):
+    """Tokens sin stopwords ni palabras cortas, uno por fila"""
+    tokens = token_lists.explode().dropna()
+    keep = (tokens.str.len() >= MIN_WORD_LENGTH) & ~tokens.isin(NORMALIZED_STOPWORDS)
+    return tokens[keep]
+
+
+def word_frequencies(review_table, n=1):
+    """
+    Cuenta palabras (n=1) o n-gramas de palabras consecutivas en las reviews
+
+    Las stopwords se eliminan antes de formar los n-gramas, así "la comida
+    es muy buena" produce el bigrama "comida buena".
+
+    Returns:
+        Counter {palabra o n-grama: frecuencia}
+    """
+    review_table = normalize_reviews(review_table)
+    tokens = _content_tokens(review_table['tokens'])
+    if tokens.empty:
+        return Counter()
+
+    # Se desplaza dentro de cada review para no unir palabras de reviews distintas
+    words = tokens.reset_index(drop=True)
+    reviews = tokens.index.to_series().reset_index(drop=True)
+    grams = words
+    for offset in range(1, n):
+        grams = grams + ' ' + words.groupby(reviews).shift(-offset)
+    grams = grams.dropna()
+
+    return Counter(grams.value_counts().to_dict())